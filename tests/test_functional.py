@@ -193,6 +193,22 @@ def test_init(shared_datadir, script_runner, tmp_path, mocker):
     assert ret.success
 
 
+def test_run_missing_data_file(script_runner, tmp_path):
+    r"""Test CLI run invocation with a non-existent slide data file"""
+    config_file = tmp_path / "config.toml"
+    with open(config_file, "w") as fp:
+        fp.write(f'[slides.missing]\ndata = "{tmp_path / "missing.h5"}"\n')
+
+    ret = script_runner.run(
+        "xfuse",
+        "run",
+        str(config_file),
+        "--save-path={}".format(str(tmp_path / "output_dir")),
+    )
+    assert not ret.success
+    assert "Data file of slide missing does not exist" in ret.stderr
+
+
 @pytest.mark.parametrize(
     "config", ["test_restore_session.1.toml", "test_restore_session.2.toml"]
 )
@@ -286,6 +302,27 @@ def test_convert_image_with_mask(shared_datadir, script_runner, tmp_path):
     assert abs(mask_final.sum() - mask_original.sum()) / mask_final.size < 0.05
 
 
+def test_convert_image_with_mismatching_mask(
+    shared_datadir, script_runner, tmp_path
+):
+    r"""Test convert image data with a mask of the wrong shape"""
+
+    ret = script_runner.run(
+        "xfuse",
+        "convert",
+        "image",
+        "--image=" + str(shared_datadir / "files" / "st" / "image.jpg"),
+        "--mask",
+        "--mask-file=" + str(shared_datadir / "files" / "visium" / "mask.png"),
+        "--no-rotate",
+        "--save-path=" + str(tmp_path),
+    )
+
+    assert not ret.success
+    assert "is not equal to the shape of the image" in ret.stderr
+    assert not os.path.exists(tmp_path / "data.h5")
+
+
 @pytest.mark.parametrize("extra_args", [[], ["--no-mask", "--scale=0.5"]])
 def test_convert_st(extra_args, shared_datadir, script_runner, tmp_path):
     r"""Test convert Spatial Transcriptomics Pipeline run"""
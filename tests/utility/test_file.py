@@ -0,0 +1,21 @@
+import pytest
+
+from xfuse.utility.file import first_unique_filename
+
+
+def test_first_unique_filename(tmp_path):
+    root_name = str(tmp_path / "file")
+    assert first_unique_filename(root_name) == root_name
+    assert first_unique_filename(root_name) == f"{root_name}.1"
+    assert first_unique_filename(root_name) == f"{root_name}.2"
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "file",
+        "file.1",
+        "file.2",
+    ]
+    assert all(p.stat().st_size == 0 for p in tmp_path.iterdir())
+
+
+def test_first_unique_filename_missing_dir(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        first_unique_filename(str(tmp_path / "missing" / "file"))
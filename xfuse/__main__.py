@@ -6,6 +6,7 @@ import logging
 import os
 import sys
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime as dt
 from functools import wraps
 
@@ -14,10 +15,11 @@ import cv2 as cv
 import h5py
 import numpy as np
 import pandas as pd
-import tomlkit
+import tomli_w
 
 from imageio import imread
 from PIL import Image
+from scipy.sparse import csr_matrix, vstack
 from tabulate import tabulate
 
 from . import __version__, convert
@@ -38,6 +40,16 @@ from .session import Session, get
 from .session.io import load_session
 from .session.items.work_dir import WorkDir
 
+# ^ NOTE: The imports above are kept at module level on purpose. The package
+#   __init__ already imports torch, pyro and the messengers through
+#   `session.items`, so deferring them to the commands would not shorten the
+#   startup time. Tests also patch `_run` and `load_session` in this module.
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
 
 def _init(f):
     @click.option(
@@ -53,7 +65,15 @@ def _init(f):
         logging.captureWarnings(True)
         with Session(work_dir=WorkDir(save_path)):
             log_filename = first_unique_filename("log")
-            with open(log_filename, "w") as log_file:
+            try:
+                # pylint: disable=consider-using-with
+                log_file = open(log_filename, "w", buffering=2 ** 16)
+            except BaseException:
+                os.remove(log_filename)
+                raise
+            # ^ NOTE: Only a failure to open the log file removes it. Once
+            #   opened, it records the run, including any errors.
+            with log_file:
                 with Session(
                     log_file=[sys.stderr, log_file],
                     log_level=DEBUG if debug else INFO,
@@ -80,6 +100,25 @@ def _init(f):
     return _wrapped
 
 
+def _read_image(file):
+    with temp_attr(Image, "MAX_IMAGE_PIXELS", None):
+        return imread(file)
+
+
+def _read_mask(file, shape):
+    # Check the dimensions from the image header before decoding the mask
+    with temp_attr(Image, "MAX_IMAGE_PIXELS", None):
+        with Image.open(file) as mask_image:
+            mask_shape = mask_image.size[::-1]
+    if mask_shape != tuple(shape):
+        raise RuntimeError(
+            f"Mask shape ({mask_shape}) is not equal to"
+            f" the shape of the image ({tuple(shape)})."
+        )
+    file.seek(0)
+    return _read_image(file)
+
+
 @click.group()
 @click.version_option()
 def cli():
@@ -125,6 +164,13 @@ cli.add_command(_convert)
     ),
 )
 @click.option("--rotate/--no-rotate", default=True)
+@click.option(
+    "--chunk-cache-size",
+    type=click.IntRange(min=0),
+    default=256,
+    help="Size (in MiB) of the HDF5 chunk cache for the barcode matrix",
+    show_default=True,
+)
 @_init
 def _convert_visium(
     image,
@@ -136,33 +182,56 @@ def _convert_visium(
     mask,
     mask_file,
     rotate,
+    chunk_cache_size,
 ):
     r"""Converts 10X Visium data"""
-    tissue_positions = pd.read_csv(tissue_positions, index_col=0, header=None)
-    tissue_positions = tissue_positions[[1, 4, 5]]
-    tissue_positions = tissue_positions.rename(
-        columns={1: "in_tissue", 4: "y", 5: "x"}
-    )
+    with h5py.File(
+        bc_matrix,
+        "r",
+        rdcc_nbytes=chunk_cache_size * 2 ** 20,
+        rdcc_nslots=1_000_003,
+    ) as data:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Decode the image in the background while parsing the other
+            # inputs
+            image_future = executor.submit(_read_image, image)
+
+            # Parse the tissue positions in batches, only keeping the spots
+            # that are in the count matrix. This bounds the memory usage for
+            # large arrays, where most spots may be outside of the tissue.
+            barcodes = data["matrix"]["barcodes"][()].astype(str)
+            tissue_positions = pd.concat(
+                chunk[chunk.index.isin(barcodes)]
+                for chunk in pd.read_csv(
+                    tissue_positions,
+                    index_col=0,
+                    header=None,
+                    usecols=[0, 1, 4, 5],
+                    dtype={1: np.int8, 4: np.float32, 5: np.float32},
+                    chunksize=250_000,
+                )
+            )
+            tissue_positions = tissue_positions.rename(
+                columns={1: "in_tissue", 4: "y", 5: "x"}
+            )
 
-    scale_factors = json.load(scale_factors)
-    spot_radius = scale_factors["spot_diameter_fullres"] / 2
+            scale_factors = json.load(scale_factors)
+            spot_radius = scale_factors["spot_diameter_fullres"] / 2
 
-    with temp_attr(Image, "MAX_IMAGE_PIXELS", None):
-        image_data = imread(image)
+            if annotation:
+                with h5py.File(annotation, "r") as annotation_file:
+                    annotation = {
+                        k: annotation_file[k][()]
+                        for k in annotation_file.keys()
+                    }
 
-    if annotation:
-        with h5py.File(annotation, "r") as annotation_file:
-            annotation = {
-                k: annotation_file[k][()] for k in annotation_file.keys()
-            }
+            image_data = image_future.result()
 
-    if mask_file:
-        with temp_attr(Image, "MAX_IMAGE_PIXELS", None):
-            custom_mask = imread(mask_file)
-    else:
-        custom_mask = None
+        if mask and mask_file:
+            custom_mask = _read_mask(mask_file, image_data.shape[:2])
+        else:
+            custom_mask = None
 
-    with h5py.File(bc_matrix, "r") as data:
         convert.visium.run(
             image_data,
             data,
@@ -230,31 +299,49 @@ def _convert_st(
             " transformation matrix"
         )
 
-    if spots is not None:
-        spots_data = pd.read_csv(spots, sep="\t")
-    else:
-        spots_data = None
-
-    if transformation_matrix is not None:
-        transformation = np.loadtxt(transformation_matrix)
-        transformation = transformation.reshape(3, 3)
-    else:
-        transformation = None
-
-    counts_data = pd.read_csv(counts, sep="\t", index_col=0)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Decode the image in the background while parsing the other inputs
+        image_future = executor.submit(_read_image, image)
+
+        if spots is not None:
+            spots_data = pd.read_csv(spots, sep="\t")
+        else:
+            spots_data = None
+
+        if transformation_matrix is not None:
+            transformation = np.loadtxt(transformation_matrix)
+            transformation = transformation.reshape(3, 3)
+        else:
+            transformation = None
+
+        # Parse the count matrix in batches and convert each batch to a
+        # sparse matrix so that the full dense matrix is never materialized.
+        # The sparse representation is kept all the way to `write_data`.
+        counts_index, counts_batches = [], []
+        for counts_batch in pd.read_csv(
+            counts, sep="\t", index_col=0, chunksize=250
+        ):
+            counts_index.append(counts_batch.index)
+            counts_columns = counts_batch.columns
+            counts_batches.append(
+                csr_matrix(counts_batch.values.astype(float))
+            )
+        counts_data = pd.DataFrame.sparse.from_spmatrix(
+            vstack(counts_batches),
+            index=counts_index[0].append(counts_index[1:]),
+            columns=counts_columns,
+        )
 
-    with temp_attr(Image, "MAX_IMAGE_PIXELS", None):
-        image_data = imread(image)
+        if annotation:
+            with h5py.File(annotation, "r") as annotation_file:
+                annotation = {
+                    k: annotation_file[k][()] for k in annotation_file.keys()
+                }
 
-    if annotation:
-        with h5py.File(annotation, "r") as annotation_file:
-            annotation = {
-                k: annotation_file[k][()] for k in annotation_file.keys()
-            }
+        image_data = image_future.result()
 
-    if mask_file:
-        with temp_attr(Image, "MAX_IMAGE_PIXELS", None):
-            custom_mask = imread(mask_file)
+    if mask and mask_file:
+        custom_mask = _read_mask(mask_file, image_data.shape[:2])
     else:
         custom_mask = None
 
@@ -308,8 +395,7 @@ def _convert_image(
     image, annotation, scale, mask, mask_file, rotate,
 ):
     r"""Converts image without any associated expression data"""
-    with temp_attr(Image, "MAX_IMAGE_PIXELS", None):
-        image_data = imread(image)
+    image_data = _read_image(image)
 
     if annotation:
         with h5py.File(annotation, "r") as annotation_file:
@@ -317,9 +403,8 @@ def _convert_image(
                 k: annotation_file[k][()] for k in annotation_file.keys()
             }
 
-    if mask_file:
-        with temp_attr(Image, "MAX_IMAGE_PIXELS", None):
-            custom_mask = imread(mask_file)
+    if mask and mask_file:
+        custom_mask = _read_mask(mask_file, image_data.shape[:2])
     else:
         custom_mask = None
 
@@ -421,9 +506,8 @@ def run(
 
     base_session = load_session(session) if session is not None else Session()
     with base_session:
-        with open(project_file) as fp:
-            config = dict(tomlkit.loads(fp.read()))
-        config = merge_config(config)
+        with open(project_file, "rb") as fp:
+            config = merge_config(tomllib.load(fp))
 
         def _expand_path(path):
             path = os.path.expanduser(path)
@@ -431,34 +515,51 @@ def run(
                 return path
             return os.path.join(os.path.dirname(project_file), path)
 
-        for name, slide in config["slides"].items():
+        def _get_data_path(name, slide):
             try:
-                data_path = slide["data"]
+                data_path = _expand_path(slide["data"])
             except KeyError as exc:
                 raise RuntimeError(
                     f"Slide {name} does not have a `data` attribute"
                 ) from exc
-            config["slides"][name]["data"] = _expand_path(data_path)
-
-        with open(first_unique_filename("merged_config.toml"), "w") as f:
-            f.write(tomlkit.dumps(config))
+            if not os.path.isfile(data_path):
+                raise RuntimeError(
+                    f"Data file of slide {name} does not exist: {data_path}"
+                )
+            return data_path
+
+        # Check the data files concurrently to hide the latency of networked
+        # filesystems when there are many slides
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(32, len(config["slides"])))
+        ) as executor:
+            data_paths = list(
+                executor.map(
+                    _get_data_path,
+                    config["slides"].keys(),
+                    config["slides"].values(),
+                )
+            )
 
-        slide_paths = {
-            name: slide["data"] for name, slide in config["slides"].items()
-        }
-        slide_options = {
-            name: slide["options"] if "options" in slide else {}
-            for name, slide in config["slides"].items()
-        }
-        slide_covariates = {
-            name: {
+        slide_paths, slide_options, slide_covariates = {}, {}, {}
+        for (name, slide), data_path in zip(
+            config["slides"].items(), data_paths
+        ):
+            slide["data"] = data_path
+            slide_paths[name] = data_path
+            slide_options[name] = slide.get("options", {})
+            slide_covariates[name] = {
                 covariate: str(condition)
-                for covariate, condition in slide["covariates"].items()
+                for covariate, condition in slide.get("covariates", {}).items()
             }
-            if "covariates" in slide
-            else {}
-            for name, slide in config["slides"].items()
-        }
+
+        merged_config_filename = first_unique_filename("merged_config.toml")
+        try:
+            with open(merged_config_filename, "wb") as f:
+                tomli_w.dump(config, f)
+        except BaseException:
+            os.remove(merged_config_filename)
+            raise
 
         covariates = {
             **{
@@ -500,12 +601,13 @@ def run(
 
         expansion_strategy = get("metagene_expansion_strategy")
         if expansion_strategy is None:
-            expansion_strategy = expansion_strategies[
-                config["expansion_strategy"]["type"]
-            ](
-                **config["expansion_strategy"][
-                    config["expansion_strategy"]["type"]
-                ]
+            # NOTE: Expansion strategies are stateful (e.g., `DropAndSplit`
+            #       tracks the tree of split metagenes) and are saved with the
+            #       session. Therefore, they must not be memoized or shared
+            #       between runs.
+            strategy_type = config["expansion_strategy"]["type"]
+            expansion_strategy = expansion_strategies[strategy_type](
+                **config["expansion_strategy"][strategy_type]
             )
 
         stats_writers = []
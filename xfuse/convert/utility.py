@@ -187,6 +187,29 @@ def find_margin(
     return col_mask, row_mask
 
 
+def _is_sparse(counts: pd.DataFrame) -> bool:
+    return counts.shape[1] > 0 and all(
+        isinstance(dtype, pd.SparseDtype) for dtype in counts.dtypes
+    )
+
+
+def to_csr(counts: pd.DataFrame) -> csr_matrix:
+    r"""
+    Converts `counts` to a :class:`~scipy.sparse.csr_matrix`. Sparse data
+    frames are converted without going through a dense intermediate.
+
+    >>> counts = pd.DataFrame.sparse.from_spmatrix(
+    ...     csr_matrix(np.array([[0, 1], [2, 0]]))
+    ... )
+    >>> to_csr(counts).toarray()
+    array([[0., 1.],
+           [2., 0.]])
+    """
+    if _is_sparse(counts):
+        return counts.sparse.to_coo().tocsr().astype(float)
+    return csr_matrix(counts.values.astype(float))
+
+
 def write_data(
     counts: pd.DataFrame,
     image: np.ndarray,
@@ -217,15 +240,21 @@ def write_data(
             "Count matrix contains duplicated columns."
             " Counts will be summed by column name."
         )
-        try:
-            counts = counts.sparse.to_dense()
-        except AttributeError:
-            pass
-        # ^ HACK: line below fails with KeyError on pandas 1.1.4 when `counts`
-        #         is sparse
-        counts = counts.sum(axis=1, level=0)
-
-    data_mask = ~np.isin(label, counts.index[counts.sum(1) == 0])
+        if _is_sparse(counts):
+            # Sum the duplicated columns by multiplying with a sparse
+            # indicator matrix so that the counts are never densified
+            codes, columns = pd.factorize(counts.columns)
+            indicator = csr_matrix(
+                (np.ones(len(codes)), (np.arange(len(codes)), codes))
+            )
+            counts = pd.DataFrame.sparse.from_spmatrix(
+                to_csr(counts) @ indicator, index=counts.index, columns=columns
+            )
+        else:
+            counts = counts.sum(axis=1, level=0)
+
+    spot_sums = np.asarray(to_csr(counts).sum(1)).flatten()
+    data_mask = ~np.isin(label, counts.index[spot_sums == 0])
     data_mask = remove_fg_elements(data_mask, 0.1)
     if not np.all(data_mask == 0):
         rect = find_min_bbox(data_mask, rotate=auto_rotate)
@@ -255,7 +284,7 @@ def write_data(
     log(INFO, "Writing data to %s", path)
     os.makedirs(os.path.normpath(os.path.dirname(path)), exist_ok=True)
     with h5py.File(path, "w") as data_file:
-        data = csr_matrix(counts.values.astype(float))
+        data = to_csr(counts)
         data_file.create_dataset(
             "counts/data", data.data.shape, float, data.data.astype(float)
         )
@@ -29,9 +29,13 @@ def _refresh_progressbars():
 
 
 @wraps(LOGGER.log)
-def log(*args, **kwargs):
+def log(level, *args, **kwargs):
     # pylint: disable=missing-function-docstring
     # pylint: disable=protected-access
+    if not LOGGER.isEnabledFor(level):
+        # Skip the progress bar redrawing and caller lookup for records that
+        # would be discarded anyway
+        return
     for pbar in _PROGRESSBARS:
         pbar._tqdm_instance.clear()
     msg_frame = inspect.currentframe().f_back
@@ -45,7 +49,7 @@ def log(*args, **kwargs):
             None,
         ),
     ):
-        LOGGER.log(*args, **kwargs)
+        LOGGER.log(level, *args, **kwargs)
     for pbar in _PROGRESSBARS:
         pbar._tqdm_instance.refresh()
 
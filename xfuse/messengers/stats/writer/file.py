@@ -37,18 +37,22 @@ class FileWriter(StatsWriter):
         r"""Logs an image"""
         training_data = get("training_data")
         *prefix, name = tag.split("/")
+        if (dirname := os.path.join("", *prefix)) != "":
+            os.makedirs(dirname, exist_ok=True)
+        img = img_tensor.detach().cpu().numpy()
+        img = _normalize(img)
+        img = (255 * img).astype(np.uint8)
         filename = first_unique_filename(
             os.path.join(
-                *prefix,
+                dirname,
                 f"{name}-{training_data.epoch}-{training_data.step}.png",
             )
         )
-        if (dirname := os.path.dirname(filename)) != "":
-            os.makedirs(dirname, exist_ok=True)
-        img = img_tensor.detach().cpu().numpy()
-        img = _normalize(img)
-        img = (255 * img).astype(np.uint8)
-        imwrite(os.path.abspath(filename), img)
+        try:
+            imwrite(os.path.abspath(filename), img)
+        except BaseException:
+            os.remove(filename)
+            raise
 
     def write_images(self, tag: str, img_tensor: torch.Tensor) -> None:
         r"""Logs an image grid"""
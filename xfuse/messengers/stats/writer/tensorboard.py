@@ -1,13 +1,16 @@
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Dict, Optional
 
 import torch
-from torch.utils.tensorboard.writer import SummaryWriter
 
 from . import StatsWriter
 from ....logging import DEBUG, log
 from ....session import get
 
 
+if TYPE_CHECKING:
+    from torch.utils.tensorboard.writer import SummaryWriter
+
+
 __all__ = ["TensorboardWriter"]
 
 
@@ -18,12 +21,17 @@ class TensorboardWriter(StatsWriter):
         self.__summary_writer = None
 
     @property
-    def _summary_writer(self) -> SummaryWriter:
+    def _summary_writer(self) -> "SummaryWriter":
         log_dir = get("work_dir").full_path
         if (
             self.__summary_writer is None
             or self.__summary_writer.log_dir != log_dir
         ):
+            # Tensorboard is slow to import, so defer the import until the
+            # writer is actually used
+            # pylint: disable=import-outside-toplevel,redefined-outer-name
+            from torch.utils.tensorboard.writer import SummaryWriter
+
             log(DEBUG, "Creating new SummaryWriter (log_dir = %s)", log_dir)
             self.__summary_writer = SummaryWriter(log_dir=log_dir)
         return self.__summary_writer
@@ -1,3 +1,4 @@
+import os
 import pickle
 import warnings
 from typing import Union
@@ -41,7 +42,11 @@ def save_session(filename_prefix: str) -> None:
 
     path = first_unique_filename(f"{filename_prefix}.session")
     log(INFO, "Saving session to %s", path)
-    torch.save((session, get_state_dict()), path)
+    try:
+        torch.save((session, get_state_dict()), path)
+    except BaseException:
+        os.remove(path)
+        raise
 
 
 def load_session(file: Union[str, BufferedReader]) -> Session:
@@ -1,29 +1,95 @@
 import logging
+import sys
+import threading
 from typing import List, Union
 from _io import TextIOWrapper
 
-from ...logging import LOGGER
+from ...logging import LOGGER, WARNING
 from ...logging.formatter import Formatter
 from .. import SessionItem, Unset, register_session_item
 
 
+class _BufferedStreamHandler(logging.StreamHandler):
+    r"""
+    :class:`~logging.StreamHandler` that flushes its stream every
+    `flush_interval` seconds from a background thread instead of after every
+    record. Records at level `WARNING` or above are flushed immediately.
+    Remaining records are flushed when the handler is closed or, through
+    :func:`logging.shutdown`, when the interpreter exits.
+    """
+
+    def __init__(self, stream, flush_interval: float = 5.0):
+        super().__init__(stream)
+        self._stop_flushing = threading.Event()
+        self._flush_thread = threading.Thread(
+            target=self._flush_periodically,
+            args=(flush_interval,),
+            daemon=True,
+        )
+        self._flush_thread.start()
+
+    def _flush_periodically(self, flush_interval: float):
+        while not self._stop_flushing.wait(flush_interval):
+            try:
+                self.flush()
+            except ValueError:
+                # Stream has been closed
+                return
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except RecursionError:
+            raise
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+            return
+        if record.levelno >= WARNING:
+            self.flush()
+
+    def close(self):
+        self._stop_flushing.set()
+        self.flush()
+        super().close()
+
+
+__CUR_FILEBUFFERS: List[TextIOWrapper] = []
+
+
 def _setter(filebuffers: Union[List[TextIOWrapper], Unset]):
+    # pylint: disable=global-statement
+    global __CUR_FILEBUFFERS
+    filebuffers = list(filebuffers) if isinstance(filebuffers, list) else []
+    if len(filebuffers) == len(__CUR_FILEBUFFERS) and all(
+        x is y for x, y in zip(filebuffers, __CUR_FILEBUFFERS)
+    ):
+        # ^ NOTE: The setter runs on every session transition. Keep the
+        #   existing handlers (and their flusher threads) when the streams
+        #   are unchanged.
+        return
+    __CUR_FILEBUFFERS = filebuffers
+
     warnings_logger = logging.getLogger("py.warnings")
     while warnings_logger.handlers != []:
         warnings_logger.removeHandler(warnings_logger.handlers[0])
 
     while LOGGER.handlers != []:
+        LOGGER.handlers[0].close()
         LOGGER.removeHandler(LOGGER.handlers[0])
 
-    if isinstance(filebuffers, list):
-        for filebuffer in filebuffers:
-            fancy_formatting = filebuffer.isatty()
+    for filebuffer in filebuffers:
+        fancy_formatting = filebuffer.isatty()
 
+        if fancy_formatting or filebuffer in (sys.stdout, sys.stderr):
+            # Keep the standard streams unbuffered so that messages are
+            # shown (or piped) as they are logged
             handler = logging.StreamHandler(filebuffer)
-            handler.setFormatter(Formatter(fancy_formatting=fancy_formatting))
+        else:
+            handler = _BufferedStreamHandler(filebuffer)
+        handler.setFormatter(Formatter(fancy_formatting=fancy_formatting))
 
-            LOGGER.addHandler(handler)
-            logging.getLogger("py.warnings").addHandler(handler)
+        LOGGER.addHandler(handler)
+        logging.getLogger("py.warnings").addHandler(handler)
 
 
 register_session_item(
@@ -65,9 +65,11 @@ def _work_dir_setter(work_dir: WorkDir) -> None:
     global __CUR_WORKDIR
     if work_dir != __CUR_WORKDIR:
         log(DEBUG, "Changing working directory to: %s", work_dir.full_path)
-        if not os.path.exists(work_dir.full_path):
+        try:
+            os.chdir(work_dir.full_path)
+        except FileNotFoundError:
             os.makedirs(work_dir.full_path, exist_ok=True)
-        os.chdir(work_dir.full_path)
+            os.chdir(work_dir.full_path)
         __CUR_WORKDIR = work_dir
 
 
@@ -42,7 +42,7 @@ class Session:
         _SESSION_STACK.append(self)
         for session in _SESSION_STACK:
             session._level += 1
-        _apply_session(get_session())
+        _apply_session()
 
     def __exit__(self, err_type, err, tb):
         if err_type is not None:
@@ -62,7 +62,7 @@ class Session:
                 session._level -= 1
             assert self._level == -1
         assert self == _SESSION_STACK.pop()
-        _apply_session(get_session())
+        _apply_session()
 
     def __str__(self):
         return (
@@ -80,9 +80,11 @@ _SESSION_STACK: List[Session] = []
 _SESSION_STORE: Dict[str, SessionItem] = {}
 
 
-def _apply_session(session: Session):
-    for name, (setter, default, _persistent) in _SESSION_STORE.items():
-        setter(getattr(session, name, default))
+def _apply_session() -> None:
+    # Resolve each item directly from the session stack instead of going
+    # through `get_session`, which would construct a throwaway `Session`
+    for name, (setter, _default, _persistent) in _SESSION_STORE.items():
+        setter(get(name))
 
 
 def get(name: str) -> Any:
@@ -22,11 +22,18 @@ def chdir(dirname: str) -> Session:
 def first_unique_filename(root_name: str) -> str:
     r"""
     Returns the first non-existent filename in the sequence "`root_name`",
-    "`root_name`.1", "`root_name`.2", ...
+    "`root_name`.1", "`root_name`.2", ... The file is created as an empty file
+    to reserve the name against concurrent callers, so the directory of
+    `root_name` must exist. Callers should remove the file if they fail to
+    write to it.
     """
     for path in it.chain(
         (root_name,), (f"{root_name}.{i}" for i in it.count(1))
     ):
-        if not os.path.exists(path):
-            return path
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+        except FileExistsError:
+            continue
+        os.close(fd)
+        return path
     raise RuntimeError("Unreachable code path")